@@ -4,16 +4,20 @@ from OpenGL.GL import *
 from OpenGL.GLU import *
 import numpy as np
 import math
+import sys
 from surfaces import TopologicalSurface, createTorus, createMoebiusStrip, createKleinBottle, createProjectivePlane, createMoebiusStrip2
+from parallelMesh import ParallelMeshExtractor
+from overviewMap import OverviewMap
 
 
 
 # --- Motor del Juego (Pygame + PyOpenGL) ---
 
 class TopologyGameEngine:
-    def __init__(self, width, height):
+    def __init__(self, width, height, parallel_mesh=False):
         self.width = width
         self.height = height
+        self.parallel_mesh = parallel_mesh # Extraer la malla local con un pool de procesos
         
         pygame.init()
         pygame.font.init()
@@ -48,6 +52,12 @@ class TopologyGameEngine:
         self.speed = 0.02
         self.view_radius = 0.3
         self.surface = createTorus()
+        self.view_distance = self.compute_view_distance()
+
+        # Mapa global (dominio fundamental + rastro)
+        self.show_overview = True
+        self.overview = OverviewMap(self.surface)
+        self.overview.addTrailPoint(self.player_pos['u'], self.player_pos['v'])
 
         # Estado de entrada
         self.keys_pressed = {}
@@ -71,6 +81,23 @@ class TopologyGameEngine:
         self.cached_metric = {}
         self.cached_basis = {}
         self.dirty_mesh = True 
+        self.mesh_extractor = None
+        self.reset_mesh_extractor()
+
+    def reset_mesh_extractor(self):
+        # Un pool (y sus buffers compartidos) por superficie
+        self.close_mesh_extractor()
+        if self.parallel_mesh:
+            self.mesh_extractor = ParallelMeshExtractor(self.surface)
+
+    def close_mesh_extractor(self):
+        self.mesh_data = (None, None, None) # Suelta las vistas sobre los buffers antiguos
+        if self.mesh_extractor is None: return
+        # PyOpenGL guarda los arrays de glVertexPointer/glNormalPointer: los soltamos
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        glNormalPointer(GL_FLOAT, 0, None)
+        self.mesh_extractor.close()
+        self.mesh_extractor = None
 
     def set_surface(self, new_type):
         self.surface_type = new_type
@@ -84,8 +111,20 @@ class TopologyGameEngine:
         self.orientation = 1
         self.turns_completed = {'u': 0, 'v': 0}
         self.player_local_offset = np.array([0.0, 0.0], dtype=np.float32) # Reset offset
+        self.reset_mesh_extractor()
+        self.view_distance = self.compute_view_distance()
+        self.overview.release()
+        self.overview = OverviewMap(self.surface)
+        self.overview.addTrailPoint(self.player_pos['u'], self.player_pos['v'])
         self.dirty_mesh = True
 
+    def compute_view_distance(self):
+        # Radio geodésico de la vista: view_radius medido en la dirección más corta
+        # de la métrica, en el centro del dominio (así no encoge cerca de los polos)
+        solver = self.surface.getGeodesicSolver()
+        u, v = (solver.vertexUV.min(axis=0) + solver.vertexUV.max(axis=0)) / 2
+        g = self.surface.getMetric(u, v)
+        return self.view_radius * math.sqrt(min(g['g11'], g['g22']))
 
 
     # --- NUEVO --- Helper para calcular los ejes del MUNDO (Naranja/Cian)
@@ -150,29 +189,31 @@ class TopologyGameEngine:
         newV = self.player_pos['v'] + dv
         
         orientation_changed = False
+        wrapped = False # Si cruzamos una costura, el rastro del mapa empieza un trazo nuevo
 
         if self.surface.wrapU:
             if newU >= 1:
-                self.turns_completed['u'] += 1; newU -= 1
+                self.turns_completed['u'] += 1; newU -= 1; wrapped = True
                 if self.surface.orientationFlipU: self.orientation *= -1; orientation_changed = True
             elif newU < 0:
-                self.turns_completed['u'] -= 1; newU += 1
+                self.turns_completed['u'] -= 1; newU += 1; wrapped = True
                 if self.surface.orientationFlipU: self.orientation *= -1; orientation_changed = True
         else:
             newU = max(0, min(1, newU))
         
         if self.surface.wrapV:
             if newV >= 1:
-                self.turns_completed['v'] += 1; newV -= 1
+                self.turns_completed['v'] += 1; newV -= 1; wrapped = True
                 if self.surface.orientationFlipV: self.orientation *= -1; orientation_changed = True
             elif newV < 0:
-                self.turns_completed['v'] -= 1; newV += 1
+                self.turns_completed['v'] -= 1; newV += 1; wrapped = True
                 if self.surface.orientationFlipV: self.orientation *= -1; orientation_changed = True
         else:
             v_range = -0.3 if self.surface.name == "Banda de Möbius" else 0
             newV = max(v_range, min(abs(v_range), newV)) if v_range < 0 else max(0, min(1, newV))
 
         self.player_pos = {'u': newU, 'v': newV}
+        self.overview.addTrailPoint(newU, newV, wrapped)
         self.dirty_mesh = True # Forzar recálculo de malla en el *próximo* frame
         
     def handle_input(self):
@@ -183,6 +224,7 @@ class TopologyGameEngine:
                 running = False
             elif event.type == pygame.KEYDOWN:
                 self.keys_pressed[event.key] = True
+                if event.key == pygame.K_m: self.show_overview = not self.show_overview
             elif event.type == pygame.KEYUP:
                 self.keys_pressed[event.key] = False
             elif event.type == pygame.MOUSEBUTTONDOWN:
@@ -261,8 +303,11 @@ class TopologyGameEngine:
     def draw_3d(self):
         # --- MODIFICADO --- Recalcular la malla SÓLO si es necesario
         if self.dirty_mesh or self.mesh_data[0] is None:
-            pos, norms, idx = self.surface.renderLocalMesh(
-                self.player_pos['u'], self.player_pos['v'], self.view_radius, self.orientation
+            # Culling con distancias geodésicas reales (método del calor)
+            tri_distances = self.surface.getGeodesicSolver().triangleDistances(self.player_pos['u'], self.player_pos['v'])
+            extract = self.mesh_extractor.extract if self.mesh_extractor else self.surface.renderLocalMesh
+            pos, norms, idx = extract(
+                self.player_pos['u'], self.player_pos['v'], self.view_distance, self.orientation, tri_distances
             )
             self.mesh_data = (pos, norms, idx)
             
@@ -344,29 +389,27 @@ class TopologyGameEngine:
             glDisableClientState(GL_NORMAL_ARRAY)
             
         # 2. Renderizar landmarks (CON EJES DEL MUNDO)
-        for lm in self.surface.landmarks:
-            dist = self.surface.uvDistance(self.player_pos['u'], self.player_pos['v'], lm['u'], lm['v'])
-            # El radio de visión del landmark DEBE ser <= al radio de la malla (0.3)
-            if dist < self.view_radius:
-                lu, lv = self.surface.adjustForWrapping(lm['u'], lm['v'], self.player_pos['u'], self.player_pos['v'])
-                
-                # Proyectar la posición del landmark al espacio R3 local
-                lm_pos = self.project_point_to_R3(lu, lv, self.player_pos['u'], self.player_pos['v'])
-                
-                glPushMatrix()
-                glTranslatef(lm_pos[0], lm_pos[1], lm_pos[2])
-                
-                # Esfera del landmark
-                glEnable(GL_LIGHTING)
-                glColor3fv(lm['color'])
-                gluSphere(self.quad, 0.04, 12, 12)
-                
-                # Ejes del MUNDO (Naranja/Cian) - (Problema 3)
-                glDisable(GL_LIGHTING)
-                self.draw_3d_arrow(v_u_3d, (1.0, 0.5, 0.0)) # Eje U (Naranja)
-                self.draw_3d_arrow(v_v_3d, (0.0, 1.0, 1.0)) # Eje V (Cian)
-                
-                glPopMatrix()
+        # El radio de visión del landmark DEBE ser <= al radio de la malla
+        for lm in self.surface.nearbyLandmarks(self.player_pos['u'], self.player_pos['v'], self.view_distance):
+            lu, lv = self.surface.adjustForWrapping(lm['u'], lm['v'], self.player_pos['u'], self.player_pos['v'])
+            
+            # Proyectar la posición del landmark al espacio R3 local
+            lm_pos = self.project_point_to_R3(lu, lv, self.player_pos['u'], self.player_pos['v'])
+            
+            glPushMatrix()
+            glTranslatef(lm_pos[0], lm_pos[1], lm_pos[2])
+            
+            # Esfera del landmark
+            glEnable(GL_LIGHTING)
+            glColor3fv(lm['color'])
+            gluSphere(self.quad, 0.04, 12, 12)
+            
+            # Ejes del MUNDO (Naranja/Cian) - (Problema 3)
+            glDisable(GL_LIGHTING)
+            self.draw_3d_arrow(v_u_3d, (1.0, 0.5, 0.0)) # Eje U (Naranja)
+            self.draw_3d_arrow(v_v_3d, (0.0, 1.0, 1.0)) # Eje V (Cian)
+            
+            glPopMatrix()
 
     def draw_2d(self):
         glMatrixMode(GL_PROJECTION)
@@ -389,7 +432,7 @@ class TopologyGameEngine:
                          GL_RGBA, GL_UNSIGNED_BYTE, text_data)
 
         draw_text("Motor Topológico", 10, 10, self.font_m)
-        draw_text("WASD: mover | Flechas/Mouse: rotar", 10, 30, self.font_s)
+        draw_text("WASD: mover | Flechas/Mouse: rotar | M: mapa", 10, 30, self.font_s)
 
         for name, data in self.buttons.items():
             rect, label = data['rect'], data['label']
@@ -408,6 +451,11 @@ class TopologyGameEngine:
         orient_color = (0, 255, 0) if self.orientation > 0 else (255, 0, 0)
         draw_text(orient_text, 10, info_y + 20, self.font_m, orient_color)
 
+        if self.show_overview:
+            size = self.overview.size
+            self.overview.draw(self.width - size - 10, self.height - size - 10,
+                               self.player_pos['u'], self.player_pos['v'])
+
 
     def run(self):
         running = True
@@ -429,9 +477,10 @@ class TopologyGameEngine:
             # 5. Esperar
             clock.tick(60)
             
+        self.close_mesh_extractor()
         pygame.quit()
 
 # --- Punto de entrada principal ---
 if __name__ == "__main__":
-    engine = TopologyGameEngine(800, 750) 
+    engine = TopologyGameEngine(800, 750, parallel_mesh='--parallel' in sys.argv)
     engine.run()
\ No newline at end of file
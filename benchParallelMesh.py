@@ -0,0 +1,68 @@
+import math
+import os
+import sys
+import time
+from surfaces import TopologicalSurface, createTorus
+from parallelMesh import ParallelMeshExtractor
+
+
+# --- Benchmark de la extracción de la malla local ---
+#
+# Uso: python benchParallelMesh.py [resolución] [radio UV] [máx. workers]
+# Compara la extracción del disco de visión en un solo proceso (vectorizada)
+# con el pool de procesos para 2, 4, 8... workers sobre un toro de
+# resolución x resolución. Como en el motor, el culling usa las distancias
+# geodésicas y el radio UV se convierte en radio geodésico. Todas las
+# ejecuciones usan la misma partición en tiles.
+
+def timeExtract(extractor, queries, radius):
+    u, v, distances = queries[0]
+    extractor.extract(u, v, radius, 1, distances)  # Calentar (arranque de los workers)
+    start = time.perf_counter()
+    for u, v, distances in queries:
+        extractor.extract(u, v, radius, 1, distances)
+    return (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    resolution = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    viewRadius = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+    maxWorkers = int(sys.argv[3]) if len(sys.argv) > 3 else (os.cpu_count() or 1)
+
+    torus = createTorus()
+    surface = TopologicalSurface()
+    surface.wrapU, surface.wrapV = True, True
+    surface.metric, surface.curvature = torus.metric, torus.curvature
+    surface.createRegularTriangulation(resolution, resolution, [0, 1], [0, 1])
+
+    # Radio geodésico como en TopologyGameEngine.compute_view_distance
+    g = surface.getMetric(0.5, 0.5)
+    radius = viewRadius * math.sqrt(min(g['g11'], g['g22']))
+
+    # Las distancias se calculan fuera del cronómetro: sólo medimos la extracción
+    solver = surface.getGeodesicSolver()
+    queries = [(0.5 + i * 0.002, 0.5, solver.triangleDistances(0.5 + i * 0.002, 0.5)) for i in range(10)]
+
+    tilesPerAxis = max(1, min(32, int(math.sqrt(len(surface.triangles) / 256))))
+    print(f"{len(surface.triangles)} triángulos, radio geodésico {radius:.2f}, "
+          f"{tilesPerAxis}x{tilesPerAxis} tiles")
+
+    extractor = ParallelMeshExtractor(surface, workers=1, tilesPerAxis=tilesPerAxis)
+    base = timeExtract(extractor, queries, radius)
+    visible = len(extractor.extract(*queries[0][:2], radius, 1, queries[0][2])[2]) // 3
+    extractor.close()
+    print(f"  {visible} triángulos en el disco")
+    print(f"  un proceso : {base * 1000:8.1f} ms")
+
+    workers = 2
+    while workers <= maxWorkers:
+        extractor = ParallelMeshExtractor(surface, workers=workers, tilesPerAxis=tilesPerAxis,
+                                          minParallelTriangles=0)
+        elapsed = timeExtract(extractor, queries, radius)
+        extractor.close()
+        print(f"  {workers} workers  : {elapsed * 1000:8.1f} ms  (x{base / elapsed:.2f})")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
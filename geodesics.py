@@ -0,0 +1,193 @@
+import numpy as np
+from scipy.sparse import coo_matrix, diags
+from scipy.sparse.linalg import factorized
+
+
+# --- Distancia geodésica: método del calor (Crane, Weischedel, Wardetzky) ---
+#
+# Todo es intrínseco: sólo usamos la triangulación y las longitudes de las
+# aristas medidas con la métrica (en su punto medio), así que vale también para
+# superficies que no están embebidas en R3. Los dos sistemas lineales
+# (flujo de calor y Poisson) se factorizan una vez por superficie, y cada
+# consulta son exactamente dos sustituciones. La fuente de calor se reparte
+# entre los tres vértices del triángulo del jugador con sus pesos
+# baricéntricos (el flujo de calor es lineal), así que el disco sigue al
+# jugador de forma continua en vez de saltar de vértice en vértice. El
+# triángulo se busca en O(1) con una rejilla de cubetas en UV.
+
+class HeatGeodesicSolver:
+    def __init__(self, surface):
+        self.surface = surface
+
+        # 1. Vértices combinatorios: identificamos los puntos pegados por el wrap
+        vertexIds = {}
+        vertexUV = []
+        triVerts = []
+        edgeUV = []
+        for tri in surface.triangles:
+            ids = []
+            for key in ('v0', 'v1', 'v2'):
+                u, v = surface.normalizeUV(tri[key][0], tri[key][1])
+                uvKey = (round(u, 9) % 1 if surface.wrapU else round(u, 9),
+                         round(v, 9) % 1 if surface.wrapV else round(v, 9))
+                if uvKey not in vertexIds:
+                    vertexIds[uvKey] = len(vertexUV)
+                    vertexUV.append(uvKey)
+                ids.append(vertexIds[uvKey])
+            triVerts.append(ids)
+            edgeUV.append([tri['v0'], tri['v1'], tri['v2']])
+
+        self.vertexUV = np.array(vertexUV, dtype=np.float64).reshape(-1, 2)
+        self.triVerts = np.array(triVerts, dtype=np.int64).reshape(-1, 3)
+        numVerts = len(self.vertexUV)
+
+        # 2. Longitudes de las aristas con la métrica evaluada en el punto medio de
+        #    cada arista: los dos triángulos que la comparten le dan la misma longitud
+        corners = np.array(edgeUV, dtype=np.float64).reshape(-1, 3, 2)
+        self.corners = corners
+        lengths = np.empty((len(corners), 3))  # lengths[:, i] = arista opuesta al vértice i
+        for t, pts in enumerate(corners):
+            for i in range(3):
+                a, b = pts[(i + 1) % 3], pts[(i + 2) % 3]
+                g = surface.getMetric(*surface.normalizeUV((a[0] + b[0]) / 2, (a[1] + b[1]) / 2))
+                du, dv = b - a
+                lengths[t, i] = np.sqrt(g['g11'] * du * du + 2 * g['g12'] * du * dv + g['g22'] * dv * dv)
+
+        # 3. Cada triángulo desplegado en el plano (p0 en el origen, p1 sobre el eje X)
+        l0, l1, l2 = lengths[:, 0], lengths[:, 1], lengths[:, 2]
+        x2 = (l2 * l2 + l1 * l1 - l0 * l0) / (2 * l2)
+        y2 = np.sqrt(np.maximum(l1 * l1 - x2 * x2, 0))
+        layout = np.zeros((len(corners), 3, 2))
+        layout[:, 1, 0] = l2
+        layout[:, 2, 0] = x2
+        layout[:, 2, 1] = y2
+        self.layout = layout
+        self.areas = 0.5 * l2 * y2
+
+        # Cotangente del ángulo en cada vértice
+        cots = np.empty((len(corners), 3))
+        for i in range(3):
+            a = layout[:, (i + 1) % 3] - layout[:, i]
+            b = layout[:, (i + 2) % 3] - layout[:, i]
+            cross = np.abs(a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0])
+            cots[:, i] = np.einsum('ij,ij->i', a, b) / np.maximum(cross, 1e-12)
+        # Triángulos degenerados (p.ej. los que tocan el polo del plano proyectivo,
+        # donde g11 se anula y falla la desigualdad triangular): no aportan nada
+        cots[self.areas < 1e-12] = 0
+        self.cots = cots
+
+        # 4. Laplaciano cotangente (semidefinido positivo) y matriz de masa diagonal
+        rows, cols, vals = [], [], []
+        for i in range(3):
+            j = self.triVerts[:, (i + 1) % 3]
+            k = self.triVerts[:, (i + 2) % 3]
+            w = 0.5 * cots[:, i]  # El ángulo en i es opuesto a la arista (j, k)
+            rows += [j, k, j, k]
+            cols += [k, j, j, k]
+            vals += [-w, -w, w, w]
+        L = coo_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+                       shape=(numVerts, numVerts)).tocsc()
+        mass = np.bincount(self.triVerts.ravel(), weights=np.repeat(self.areas / 3, 3), minlength=numVerts)
+        M = diags(mass)
+
+        # 5. Factorizaciones cacheadas: t = h^2, con h la longitud media de las aristas
+        h = lengths.mean()
+        self.solveHeat = factorized((M + h * h * L).tocsc())
+        self.solvePoisson = factorized((L + 1e-8 * M).tocsc())  # L es singular: regularizamos
+
+        # 6. Rejilla de cubetas en UV: cubeta -> triángulos cuya caja la toca
+        self.gridLo = corners.reshape(-1, 2).min(axis=0) if len(corners) else np.zeros(2)
+        self.gridHi = corners.reshape(-1, 2).max(axis=0) if len(corners) else np.ones(2)
+        self.gridSize = max(1, int(np.sqrt(len(corners) / 2)))
+        first = self.cellOf(corners.min(axis=1))
+        last = self.cellOf(corners.max(axis=1))
+        span = last - first
+        cells, tris = [], []
+        for du in range(int(span[:, 0].max(initial=0)) + 1):
+            for dv in range(int(span[:, 1].max(initial=0)) + 1):
+                hit = np.nonzero((span[:, 0] >= du) & (span[:, 1] >= dv))[0]
+                cells.append((first[hit, 0] + du) * self.gridSize + first[hit, 1] + dv)
+                tris.append(hit)
+        cells, tris = np.concatenate(cells), np.concatenate(tris)
+        order = np.argsort(cells, kind='stable')
+        self.cellTris = tris[order]
+        self.cellStart = np.concatenate([[0], np.cumsum(np.bincount(cells, minlength=self.gridSize ** 2))])
+
+        self.lastQuery = None
+
+    def cellOf(self, uv):
+        cell = np.floor((uv - self.gridLo) / np.maximum(self.gridHi - self.gridLo, 1e-12) * self.gridSize)
+        return np.clip(cell.astype(int), 0, self.gridSize - 1)
+
+    def locate(self, u, v):
+        """Triángulo que contiene (u, v): índices de sus vértices y pesos baricéntricos."""
+        u, v = self.surface.normalizeUV(u, v)
+        point = np.clip(np.array([u, v], dtype=np.float64), self.gridLo, self.gridHi)
+        cu, cv = self.cellOf(point)
+        cell = cu * self.gridSize + cv
+        candidates = self.cellTris[self.cellStart[cell]:self.cellStart[cell + 1]]
+        if len(candidates) == 0: candidates = np.arange(len(self.corners))
+
+        c = self.corners[candidates]
+        ax, ay = c[:, 0, 0], c[:, 0, 1]
+        bx, by = c[:, 1, 0] - ax, c[:, 1, 1] - ay
+        cx, cy = c[:, 2, 0] - ax, c[:, 2, 1] - ay
+        px, py = point[0] - ax, point[1] - ay
+        den = bx * cy - cx * by
+        w1 = (px * cy - cx * py) / den
+        w2 = (bx * py - px * by) / den
+        weights = np.stack([1 - w1 - w2, w1, w2], axis=1)
+
+        # El que mejor lo contiene (también vale si el punto cae justo fuera)
+        best = int(np.argmax(weights.min(axis=1)))
+        w = np.clip(weights[best], 0, None)
+        return self.triVerts[candidates[best]], w / w.sum()
+
+    def distanceField(self, u, v):
+        """Distancia geodésica desde (u, v) a cada vértice de la triangulación."""
+        if self.lastQuery is not None and self.lastQuery[0] == (u, v): return self.lastQuery[1]
+        verts, weights = self.locate(u, v)
+
+        # I. Flujo de calor durante un tiempo t (fuente repartida en el triángulo)
+        delta = np.zeros(len(self.vertexUV))
+        np.add.at(delta, verts, weights)
+        heat = self.solveHeat(delta)
+
+        # II. Campo X = -grad(u) / |grad(u)| en cada triángulo
+        p = self.layout
+        hu = heat[self.triVerts]
+        grad = np.zeros((len(p), 2))
+        for i in range(3):
+            e = p[:, (i + 2) % 3] - p[:, (i + 1) % 3]  # Arista opuesta a i (sentido antihorario)
+            grad += hu[:, i, None] * np.stack([-e[:, 1], e[:, 0]], axis=1)
+        grad /= 2 * np.maximum(self.areas, 1e-12)[:, None]
+        norm = np.linalg.norm(grad, axis=1, keepdims=True)
+        X = -np.divide(grad, norm, out=np.zeros_like(grad), where=norm > 0)
+
+        # III. Divergencia de X en cada vértice y ecuación de Poisson
+        div = np.zeros(len(self.vertexUV))
+        for i in range(3):
+            j, k = (i + 1) % 3, (i + 2) % 3
+            e1 = p[:, j] - p[:, i]
+            e2 = p[:, k] - p[:, i]
+            contrib = 0.5 * (self.cots[:, k] * np.einsum('ij,ij->i', e1, X) +
+                             self.cots[:, j] * np.einsum('ij,ij->i', e2, X))
+            div += np.bincount(self.triVerts[:, i], weights=contrib, minlength=len(div))
+        phi = self.solvePoisson(-div)
+
+        # Distancia 0 en la posición del jugador
+        field = np.maximum(phi - np.dot(phi[verts], weights), 0)
+        self.lastQuery = ((u, v), field)
+        return field
+
+    def fieldAt(self, field, u, v):
+        """Valor de un campo por vértices en el punto (u, v), interpolado en su triángulo."""
+        verts, weights = self.locate(u, v)
+        return float(np.dot(field[verts], weights))
+
+    def triangleDistances(self, u, v):
+        """Distancia geodésica desde (u, v) al centro de cada triángulo (mismo orden que surface.triangles)."""
+        return self.distanceField(u, v)[self.triVerts].mean(axis=1)
+
+    def distance(self, u1, v1, u2, v2):
+        return self.fieldAt(self.distanceField(u1, v1), u2, v2)
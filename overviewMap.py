@@ -0,0 +1,223 @@
+import math
+import pygame
+from OpenGL.GL import *
+
+
+# --- Mapa global del dominio fundamental ---
+#
+# La triangulación, las costuras y los landmarks se rasterizan una sola vez por
+# superficie en una textura. El rastro del jugador se pinta encima segmento a
+# segmento; cuando sus puntos superan el presupuesto se hornean en una capa
+# intermedia (base + rastro), y cuando cambia un landmark sólo se repinta la
+# región afectada a partir de esa capa.
+# Cada frame sólo se suben a la GPU los rectángulos sucios y se dibuja un quad.
+
+SEAM_COLORS = {'u': (255, 140, 0), 'v': (0, 200, 200)}
+TRAIL_COLOR = (255, 51, 102)
+
+
+def _simplifyStroke(points, epsilon):
+    # Ramer-Douglas-Peucker
+    if len(points) < 3: return list(points)
+    (x0, y0), (x1, y1) = points[0], points[-1]
+    dx, dy = x1 - x0, y1 - y0
+    length = math.hypot(dx, dy)
+    maxDist, maxIndex = 0, 0
+    for i in range(1, len(points) - 1):
+        px, py = points[i]
+        if length > 0: d = abs(dy * (px - x0) - dx * (py - y0)) / length
+        else: d = math.hypot(px - x0, py - y0)
+        if d > maxDist: maxDist, maxIndex = d, i
+    if maxDist <= epsilon: return [points[0], points[-1]]
+    left = _simplifyStroke(points[:maxIndex + 1], epsilon)
+    right = _simplifyStroke(points[maxIndex:], epsilon)
+    return left[:-1] + right
+
+
+class OverviewMap:
+    def __init__(self, surface, size=256, maxTrailPoints=2000, minStep=2.0):
+        self.surface = surface
+        self.size = size
+        self.maxTrailPoints = maxTrailPoints
+        self.minStep = minStep  # Distancia mínima (en píxeles) entre puntos del rastro
+
+        us = [tri[key][0] for tri in surface.triangles for key in ('v0', 'v1', 'v2')]
+        vs = [tri[key][1] for tri in surface.triangles for key in ('v0', 'v1', 'v2')]
+        self.uRange = (min(us), max(us)) if us else (0, 1)
+        self.vRange = (min(vs), max(vs)) if vs else (0, 1)
+
+        # Capa estática (triángulos + costuras), capa con el rastro ya horneado
+        # y capa compuesta (más el rastro reciente y los landmarks) que se sube a la textura
+        self.base = pygame.Surface((size, size), pygame.SRCALPHA)
+        self.rasterizeSurface(self.base)
+        self.trailLayer = self.base.copy()
+        self.image = self.base.copy()
+        self.landmarkState = self.snapshotLandmarks()
+        for lm in self.surface.landmarks: self.drawLandmark(self.image, lm)
+
+        self.strokes = [[]]  # Polilíneas del rastro aún sin hornear (se cortan al cruzar una costura)
+        self.trailCount = 0
+        self.texture = None
+        self.dirty = self.image.get_rect()  # Unión de las regiones pendientes de subir (o None)
+
+    def toPixel(self, u, v):
+        uMin, uMax = self.uRange
+        vMin, vMax = self.vRange
+        x = (u - uMin) / ((uMax - uMin) or 1) * (self.size - 1)
+        y = (1 - (v - vMin) / ((vMax - vMin) or 1)) * (self.size - 1)
+        return x, y
+
+    # --- Rasterizado (una vez por superficie) ---
+
+    def rasterizeSurface(self, target):
+        target.fill((20, 30, 45, 255))
+        for tri in self.surface.triangles:
+            pts = [self.toPixel(*tri[key]) for key in ('v0', 'v1', 'v2')]
+            pygame.draw.polygon(target, (74, 144, 226, 255), pts)
+            pygame.draw.polygon(target, (45, 95, 160, 255), pts, 1)
+        self.drawSeams(target)
+
+    def drawSeams(self, target):
+        # Lados identificados: mismo color y flechas en el sentido del pegado
+        last = self.size - 1
+        if self.surface.wrapU:
+            flip = -1 if self.surface.orientationFlipU else 1
+            self.drawSeam(target, (0, last), (0, 0), 1, SEAM_COLORS['u'])
+            self.drawSeam(target, (last, last), (last, 0), flip, SEAM_COLORS['u'])
+        if self.surface.wrapV:
+            flip = -1 if self.surface.orientationFlipV else 1
+            self.drawSeam(target, (0, last), (last, last), 1, SEAM_COLORS['v'])
+            self.drawSeam(target, (0, 0), (last, 0), flip, SEAM_COLORS['v'])
+
+    def drawSeam(self, target, start, end, direction, color):
+        pygame.draw.line(target, color, start, end, 3)
+        if direction < 0: start, end = end, start
+        mx, my = (start[0] + end[0]) / 2, (start[1] + end[1]) / 2
+        dx, dy = end[0] - start[0], end[1] - start[1]
+        length = math.hypot(dx, dy) or 1
+        dx, dy = dx / length * 8, dy / length * 8
+        tip = (mx + dx, my + dy)
+        pygame.draw.polygon(target, color, [tip, (mx - dy * 0.6, my + dx * 0.6), (mx + dy * 0.6, my - dx * 0.6)])
+
+    def landmarkRect(self, u, v):
+        x, y = self.toPixel(u, v)
+        return pygame.Rect(int(x) - 6, int(y) - 6, 13, 13)
+
+    def drawLandmark(self, target, lm):
+        color = tuple(int(c * 255) for c in lm['color'])
+        pygame.draw.circle(target, color, self.toPixel(lm['u'], lm['v']), 5)
+        pygame.draw.circle(target, (255, 255, 255), self.toPixel(lm['u'], lm['v']), 5, 1)
+
+    def snapshotLandmarks(self):
+        return [(lm['u'], lm['v'], tuple(lm['color'])) for lm in self.surface.landmarks]
+
+    # --- Rastro del jugador (incremental) ---
+
+    def addTrailPoint(self, u, v, newStroke=False):
+        p = self.toPixel(u, v)
+        stroke = self.strokes[-1]
+        if newStroke and stroke:
+            self.strokes.append([p])
+            self.trailCount += 1
+            return
+        if not stroke:
+            stroke.append(p)
+            self.trailCount += 1
+            return
+
+        last = stroke[-1]
+        if math.hypot(p[0] - last[0], p[1] - last[1]) < self.minStep: return
+
+        rect = pygame.draw.line(self.image, TRAIL_COLOR, last, p, 2)
+        self.markDirty(rect.inflate(2, 2))
+
+        # Si el punto anterior está alineado con el nuevo, lo sustituimos
+        if len(stroke) >= 2 and len(_simplifyStroke([stroke[-2], last, p], 0.5)) == 2:
+            stroke[-1] = p
+        else:
+            stroke.append(p)
+            self.trailCount += 1
+        if self.trailCount > self.maxTrailPoints: self.bakeTrail()
+
+    def bakeTrail(self):
+        # Los trazos pasan a la capa del rastro con todo su detalle, así que
+        # redrawRegion los recupera de ahí. Sólo guardamos el último punto para
+        # que el trazo actual continúe sin cortes
+        for stroke in self.strokes:
+            if len(stroke) >= 2: pygame.draw.lines(self.trailLayer, TRAIL_COLOR, False, stroke, 2)
+        self.strokes = [[self.strokes[-1][-1]]]
+        self.trailCount = 1
+
+    # --- Regiones sucias ---
+
+    def updateLandmarks(self):
+        state = self.snapshotLandmarks()
+        if state == self.landmarkState: return
+        changed = set(state) ^ set(self.landmarkState)
+        self.landmarkState = state
+        for u, v, color in changed: self.redrawRegion(self.landmarkRect(u, v))
+
+    def redrawRegion(self, rect):
+        rect = rect.clip(self.image.get_rect())
+        if rect.width == 0 or rect.height == 0: return
+        self.image.blit(self.trailLayer, rect, rect)
+        self.image.set_clip(rect)
+        for stroke in self.strokes:
+            if len(stroke) >= 2: pygame.draw.lines(self.image, TRAIL_COLOR, False, stroke, 2)
+        for lm in self.surface.landmarks: self.drawLandmark(self.image, lm)
+        self.image.set_clip(None)
+        self.markDirty(rect)
+
+    def markDirty(self, rect):
+        # Un solo rectángulo acumulado: no crece aunque el mapa esté oculto
+        self.dirty = rect if self.dirty is None else self.dirty.union(rect)
+
+    def uploadDirty(self):
+        if self.texture is None:
+            self.texture = glGenTextures(1)
+            glBindTexture(GL_TEXTURE_2D, self.texture)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, self.size, self.size, 0, GL_RGBA, GL_UNSIGNED_BYTE,
+                         pygame.image.tostring(self.image, "RGBA"))
+            self.dirty = None
+            return
+        if self.dirty is None: return
+        rect = self.dirty.clip(self.image.get_rect())
+        self.dirty = None
+        if rect.width == 0 or rect.height == 0: return
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        glTexSubImage2D(GL_TEXTURE_2D, 0, rect.x, rect.y, rect.width, rect.height, GL_RGBA, GL_UNSIGNED_BYTE,
+                        pygame.image.tostring(self.image.subsurface(rect), "RGBA"))
+
+    # --- Dibujo (cada frame, con la proyección 2D de draw_2d) ---
+
+    def draw(self, x, y, playerU, playerV):
+        self.updateLandmarks()
+        self.uploadDirty()
+
+        glEnable(GL_TEXTURE_2D)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glColor4f(1, 1, 1, 1)
+        glBegin(GL_QUADS)
+        glTexCoord2f(0, 0); glVertex2f(x, y)
+        glTexCoord2f(1, 0); glVertex2f(x + self.size, y)
+        glTexCoord2f(1, 1); glVertex2f(x + self.size, y + self.size)
+        glTexCoord2f(0, 1); glVertex2f(x, y + self.size)
+        glEnd()
+        glDisable(GL_TEXTURE_2D)
+
+        # Posición actual del jugador (no se hornea en la textura)
+        px, py = self.toPixel(playerU, playerV)
+        glPointSize(7)
+        glColor3f(1.0, 1.0, 1.0)
+        glBegin(GL_POINTS)
+        glVertex2f(x + px, y + py)
+        glEnd()
+        glPointSize(1)
+
+    def release(self):
+        if self.texture is not None:
+            glDeleteTextures([self.texture])
+            self.texture = None
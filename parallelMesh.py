@@ -0,0 +1,257 @@
+import math
+import os
+import numpy as np
+import multiprocessing
+from multiprocessing import shared_memory
+
+
+# --- Extracción de la malla local en paralelo ---
+#
+# Los triángulos de la superficie se agrupan en "tiles" (una rejilla U x V) que
+# viven en memoria compartida como rangos contiguos. Los tiles que tocan el
+# disco de visión se reparten entre los procesos del pool, que recortan y
+# proyectan sus tiles y escriben el resultado en el rango de cada tile del
+# buffer de salida compartido, así que no hay que copiar ni concatenar nada al
+# volver: basta con construir los índices de cada rango.
+
+# El pool se crea cuando pygame ya tiene hilos de SDL y un contexto GL abiertos:
+# hacer fork de ese proceso no es seguro, así que arrancamos los trabajadores
+# limpios (forkserver donde exista, spawn en otro caso)
+_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+# Bloques liberados por close() que siguen mapeados porque alguien (p.ej.
+# PyOpenGL tras glVertexPointer) conserva vistas sobre ellos
+_retiredBlocks = []
+
+
+def _view(block, shape, dtype):
+    # np.frombuffer exporta el buffer: mientras viva la vista, block.close() falla
+    # con BufferError en vez de desmapear la memoria debajo de ella
+    count = int(np.prod(shape))
+    return np.frombuffer(block.buf, dtype=dtype, count=count).reshape(shape)
+
+
+def _releaseRetired():
+    for block in list(_retiredBlocks):
+        try:
+            block.close()
+            _retiredBlocks.remove(block)
+        except BufferError:
+            pass
+
+
+# Estado de cada proceso trabajador (se rellena en _initWorker)
+_worker = {}
+
+
+def _initWorker(names, numTriangles, wrapU, wrapV):
+    blocks = {key: shared_memory.SharedMemory(name=name) for key, name in names.items()}
+    _worker['blocks'] = blocks  # Mantener vivas las referencias
+    _worker['triangles'] = _view(blocks['triangles'], (numTriangles, 3, 2), np.float64)
+    _worker['distances'] = _view(blocks['distances'], (numTriangles,), np.float64)
+    _worker['positions'] = _view(blocks['positions'], (numTriangles * 3, 3), np.float32)
+    _worker['normals'] = _view(blocks['normals'], (numTriangles * 3, 3), np.float32)
+    _worker['wrapU'] = wrapU
+    _worker['wrapV'] = wrapV
+
+
+def _adjustAxis(values, center):
+    # Igual que adjustForWrapping: de {x-1, x, x+1} nos quedamos con el más cercano
+    options = np.stack([values - 1, values, values + 1], axis=-1)
+    pick = np.argmin(np.abs(options - center), axis=-1)
+    return np.take_along_axis(options, pick[..., None], axis=-1)[..., 0]
+
+
+def _extractTiles(task, state=None):
+    # state: buffers y flags (por defecto, los del proceso trabajador)
+    state = _worker if state is None else state
+    tiles, params = task
+    return [_extractTile(start, stop, params, state) for start, stop in tiles]
+
+
+def _extractTile(start, stop, params, state):
+    centerU, centerV, radius, orientation, frame, useDistances = params
+    tris = state['triangles'][start:stop]
+
+    # 1. Culling (el mismo criterio que renderLocalMesh)
+    if useDistances:
+        keep = state['distances'][start:stop] < radius
+    else:
+        centers = tris.mean(axis=1)
+        du = np.abs(centers[:, 0] - centerU)
+        dv = np.abs(centers[:, 1] - centerV)
+        if state['wrapU']: du = np.minimum(du, 1 - du)
+        if state['wrapV']: dv = np.minimum(dv, 1 - dv)
+        keep = np.sqrt(du * du + dv * dv) < radius
+    tris = tris[keep]
+    count = len(tris)
+    if count == 0: return start, 0
+
+    # 2. Proyección a R3 (vectorizada, equivalente a projectTriangleToR3)
+    u = tris[:, :, 0]
+    v = tris[:, :, 1]
+    if state['wrapU']: u = _adjustAxis(u % 1, centerU)
+    if state['wrapV']: v = _adjustAxis(v % 1, centerV)
+
+    e1x, e1y, e2x, e2y, g11_sqrt, g22_sqrt, K = frame
+    du = u - centerU
+    dv = v - centerV
+    x = e1x * du * g11_sqrt + e2x * dv * g22_sqrt
+    y = e1y * du * g11_sqrt + e2y * dv * g22_sqrt
+    z = -K * (x * x + y * y) * 0.5
+    p = np.stack([x, y, z], axis=-1)
+    if orientation < 0: p = p[:, [0, 2, 1]]
+
+    # 3. Normales por cara
+    n = np.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0])
+    norm = np.linalg.norm(n, axis=1, keepdims=True)
+    n = np.divide(n, norm, out=n, where=norm > 0)
+
+    out = slice(start * 3, (start + count) * 3)
+    state['positions'][out] = p.reshape(-1, 3)
+    state['normals'][out] = np.repeat(n, 3, axis=0)
+    return start, count
+
+
+class ParallelMeshExtractor:
+    """Versión multiproceso de TopologicalSurface.renderLocalMesh.
+
+    Devuelve lo mismo que renderLocalMesh, pero las posiciones y normales son
+    vistas sobre los buffers compartidos: sólo los vértices referenciados por
+    los índices son válidos, y se sobrescriben en la siguiente llamada a
+    extract. Tras close siguen mapeados hasta que se suelta la última vista.
+
+    Por debajo de minParallelTriangles (o con un solo worker) los tiles se
+    procesan en este mismo proceso: con las superficies pequeñas el viaje de
+    ida y vuelta al pool cuesta más que el trabajo en sí.
+
+    La partición en tiles sólo depende de la malla (tilesPerAxis), no del
+    número de workers: los tiles visibles se reparten entre los workers.
+    """
+
+    def __init__(self, surface, workers=None, tilesPerAxis=None, minParallelTriangles=20000):
+        _releaseRetired()
+        self.surface = surface
+        self.workers = workers or os.cpu_count() or 1
+
+        tris = np.array([[t['v0'], t['v1'], t['v2']] for t in surface.triangles], dtype=np.float64)
+        tris = tris.reshape(-1, 3, 2)
+        self.numTriangles = len(tris)
+
+        # Rejilla U x V de tiles (unos 256 triángulos por tile por defecto)
+        if tilesPerAxis is None: tilesPerAxis = max(1, min(32, int(math.sqrt(self.numTriangles / 256))))
+        centers = tris.mean(axis=1)
+        lo = centers.min(axis=0) if self.numTriangles else np.zeros(2)
+        hi = centers.max(axis=0) if self.numTriangles else np.ones(2)
+        cell = np.floor((centers - lo) / np.maximum(hi - lo, 1e-12) * tilesPerAxis).astype(int)
+        cell = np.clip(cell, 0, tilesPerAxis - 1)
+        tileIds = cell[:, 0] * tilesPerAxis + cell[:, 1]
+
+        # Triángulos ordenados por tile -> cada tile es un rango contiguo
+        self.order = np.argsort(tileIds, kind='stable')
+        tris = tris[self.order]
+        centers = centers[self.order]
+        counts = np.bincount(tileIds, minlength=tilesPerAxis * tilesPerAxis)
+        bounds = np.concatenate([[0], np.cumsum(counts)])
+        self.tiles = [(int(bounds[i]), int(bounds[i + 1])) for i in range(len(counts)) if counts[i] > 0]
+        # Caja (en UV) de los centros de cada tile, para descartar tiles enteros
+        self.tileBoxes = [(centers[a:b].min(axis=0), centers[a:b].max(axis=0)) for a, b in self.tiles]
+
+        # Buffers compartidos
+        n = max(1, self.numTriangles)
+        sizes = {
+            'triangles': n * 3 * 2 * 8,
+            'distances': n * 8,
+            'positions': n * 3 * 3 * 4,
+            'normals': n * 3 * 3 * 4,
+        }
+        self.blocks = {key: shared_memory.SharedMemory(create=True, size=size) for key, size in sizes.items()}
+        self.triangles = _view(self.blocks['triangles'], (self.numTriangles, 3, 2), np.float64)
+        self.distances = _view(self.blocks['distances'], (self.numTriangles,), np.float64)
+        self.positions = _view(self.blocks['positions'], (self.numTriangles * 3, 3), np.float32)
+        self.normals = _view(self.blocks['normals'], (self.numTriangles * 3, 3), np.float32)
+        self.triangles[:] = tris
+
+        self.state = {'triangles': self.triangles, 'distances': self.distances,
+                      'positions': self.positions, 'normals': self.normals,
+                      'wrapU': surface.wrapU, 'wrapV': surface.wrapV}
+        self.closed = False
+        self.pool = None
+        if self.workers == 1 or self.numTriangles < minParallelTriangles: return
+
+        names = {key: block.name for key, block in self.blocks.items()}
+        context = multiprocessing.get_context(_START_METHOD)
+        self.pool = context.Pool(self.workers, initializer=_initWorker,
+                                 initargs=(names, self.numTriangles, surface.wrapU, surface.wrapV))
+
+    def _axisDistance(self, center, lo, hi, wrap):
+        # Distancia de center al intervalo [lo, hi] (en la circunferencia si hay wrap)
+        if lo <= center <= hi: return 0
+        dLo, dHi = abs(center - lo), abs(center - hi)
+        if wrap: dLo, dHi = min(dLo, 1 - dLo), min(dHi, 1 - dHi)
+        return min(dLo, dHi)
+
+    def _tileIsVisible(self, box, centerU, centerV, radius):
+        (uLo, vLo), (uHi, vHi) = box
+        du = self._axisDistance(centerU, uLo, uHi, self.surface.wrapU)
+        dv = self._axisDistance(centerV, vLo, vHi, self.surface.wrapV)
+        return du * du + dv * dv < radius * radius
+
+    def _balance(self, tiles):
+        # Reparto greedy (el tile más grande al worker menos cargado)
+        groups = [[] for i in range(min(self.workers, len(tiles)))]
+        loads = [0] * len(groups)
+        for start, stop in sorted(tiles, key=lambda tile: tile[0] - tile[1]):
+            i = loads.index(min(loads))
+            groups[i].append((start, stop))
+            loads[i] += stop - start
+        return groups
+
+    def _localFrame(self, centerU, centerV):
+        # La base, la métrica y la curvatura sólo dependen del centro
+        basis = self.surface.getTangentBasis(centerU, centerV)
+        g = self.surface.getMetric(centerU, centerV)
+        K = self.surface.getGaussianCurvature(centerU, centerV)
+        return (float(basis['e1'][0]), float(basis['e1'][1]),
+                float(basis['e2'][0]), float(basis['e2'][1]),
+                math.sqrt(g['g11']), math.sqrt(g['g22']), float(K))
+
+    def extract(self, centerU, centerV, radius, orientation, distances=None):
+        frame = self._localFrame(centerU, centerV)
+        if distances is not None:
+            # Distancias por triángulo (en el orden de surface.triangles) -> orden de los tiles
+            self.distances[:] = np.asarray(distances, dtype=np.float64)[self.order]
+            starts = [a for a, b in self.tiles]
+            tileMin = np.minimum.reduceat(self.distances, starts) if starts else []
+            visible = [d < radius for d in tileMin]
+        else:
+            visible = [self._tileIsVisible(box, centerU, centerV, radius) for box in self.tileBoxes]
+        tiles = [tile for tile, isVisible in zip(self.tiles, visible) if isVisible]
+        params = (centerU, centerV, radius, orientation, frame, distances is not None)
+
+        # Cosido: cada tile escribió [3*start, 3*(start+count)) en el buffer
+        if self.pool is not None:
+            tasks = [(group, params) for group in self._balance(tiles)]
+            results = [result for group in self.pool.map(_extractTiles, tasks) for result in group]
+        else:
+            results = _extractTiles((tiles, params), self.state)
+        indices = [np.arange(start * 3, (start + count) * 3, dtype=np.uint32)
+                   for start, count in results if count > 0]
+        indices = np.concatenate(indices) if indices else np.array([], dtype=np.uint32)
+        return self.positions, self.normals, indices
+
+    def close(self):
+        if self.closed: return
+        self.closed = True
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        # Soltar las vistas antes de liberar la memoria compartida
+        self.triangles = self.distances = self.positions = self.normals = None
+        self.state = None
+        for block in self.blocks.values():
+            block.unlink()  # El nombre desaparece; la memoria vive mientras haya vistas
+            _retiredBlocks.append(block)
+        self.blocks = {}
+        _releaseRetired()
@@ -15,6 +15,7 @@ class TopologicalSurface:
         self.wrapV = False
         self.orientationFlipU = False
         self.orientationFlipV = False
+        self.geodesics = None
 
     def createRegularTriangulation(self, resU, resV, uRange, vRange):
         self.triangles = []
@@ -56,6 +57,23 @@ class TopologicalSurface:
         if self.wrapV: dv = min(dv, 1 - dv)
         return math.sqrt(du*du + dv*dv)
 
+    def getGeodesicSolver(self):
+        # Se construye (y factoriza) una sola vez por superficie. scipy sólo hace
+        # falta a partir de aquí: importar surfaces no lo requiere
+        if self.geodesics is None:
+            from geodesics import HeatGeodesicSolver
+            self.geodesics = HeatGeodesicSolver(self)
+        return self.geodesics
+
+    def geodesicDistance(self, u1, v1, u2, v2):
+        return self.getGeodesicSolver().distance(u1, v1, u2, v2)
+
+    def nearbyLandmarks(self, u, v, radius):
+        # Landmarks a distancia geodésica < radius (proximidad, triggers de NPCs...)
+        solver = self.getGeodesicSolver()
+        field = solver.distanceField(u, v)
+        return [lm for lm in self.landmarks if solver.fieldAt(field, lm['u'], lm['v']) < radius]
+
     def getMetric(self, u, v):
         if self.metric: return self.metric(u, v)
         return {'g11': 1, 'g12': 0, 'g22': 1}
@@ -119,18 +137,23 @@ class TopologicalSurface:
         
         return [p0, p2, p1] if orientation < 0 else [p0, p1, p2]
 
-    def renderLocalMesh(self, centerU, centerV, radius, orientation):
+    def renderLocalMesh(self, centerU, centerV, radius, orientation, distances=None):
+        # distances: distancia de cada triángulo al centro (p.ej. geodésica);
+        # si no se da, se usa uvDistance
         positions = []
         normals = []
         indices = []
         vertexCount = 0
         
-        for tri in self.triangles:
-            triCenter = [
-                (tri['v0'][0] + tri['v1'][0] + tri['v2'][0]) / 3,
-                (tri['v0'][1] + tri['v1'][1] + tri['v2'][1]) / 3
-            ]
-            dist = self.uvDistance(centerU, centerV, triCenter[0], triCenter[1])
+        for t, tri in enumerate(self.triangles):
+            if distances is not None:
+                dist = distances[t]
+            else:
+                triCenter = [
+                    (tri['v0'][0] + tri['v1'][0] + tri['v2'][0]) / 3,
+                    (tri['v0'][1] + tri['v1'][1] + tri['v2'][1]) / 3
+                ]
+                dist = self.uvDistance(centerU, centerV, triCenter[0], triCenter[1])
             
             if dist < radius:
                 p0, p1, p2 = self.projectTriangleToR3(tri, centerU, centerV, orientation)